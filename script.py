@@ -3,84 +3,198 @@ import csv
 import os
 import sys
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from operator import itemgetter
 from tabulate import tabulate
 
 
-def read_csv_files(files):
-    """Читает данные из всех переданных CSV-файлов и возвращает объединенный список."""
-    data = []
-    
-    for file in files:
-        try:
-            with open(file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
+# Суммарный размер входных файлов, начиная с которого их разбор распределяется по процессам
+PARALLEL_MIN_BYTES = 1 << 20
+# Предельное число различных строк рейтинга, запоминаемых при разборе одного файла
+RATING_CACHE_SIZE = 1024
+# Сколько отброшенных строк файла перечислять в итоговом предупреждении
+SKIPPED_ROWS_SHOWN = 5
+
+
+def _advise_sequential_read(f):
+    """Сообщает ядру, что файл будет читаться последовательно, чтобы усилить упреждающее чтение."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except OSError:
+        # Например, для каналов
+        pass
+
+
+def _read_csv_file(file):
+    """Читает один CSV-файл и по одной отдает валидные пары (бренд, рейтинг)."""
+    try:
+        # newline='' - режим, ожидаемый модулем csv
+        with open(file, 'r', encoding='utf-8', newline='', buffering=1 << 20) as f:
+            _advise_sequential_read(f)
+            reader = csv.reader(f)
+            header = next(reader, None)
+
+            # Проверяем наличие обязательных колонок
+            if header is None or not all(field in header for field in ['brand', 'rating']):
+                print(f"Предупреждение: в файле {file} отсутствуют обязательные колонки 'brand' или 'rating'")
+                return
+
+            # Позиции колонок определяются один раз по заголовку
+            get_fields = itemgetter(header.index('brand'), header.index('rating'))
+            
+            # Уже разобранные значения рейтинга
+            parsed_ratings = {}
+            rows_processed = 0
+            skipped_count = 0
+            skipped_examples = []
+            for row_num, row in enumerate(reader, 2):  # начинаем с 2 (заголовок - строка 1)
+                try:
+                    brand, rating_str = get_fields(row)
+                except IndexError:
+                    # Пустая строка или строка без нужных полей
+                    continue
+                
+                brand = brand.strip()
                 
-                # Проверяем наличие обязательных колонок
-                if reader.fieldnames is None or not all(field in reader.fieldnames for field in ['brand', 'rating']):
-                    print(f"Предупреждение: в файле {file} отсутствуют обязательные колонки 'brand' или 'rating'")
+                # Пропускаем пустые значения
+                if not brand or not rating_str or rating_str.isspace():
                     continue
                 
-                rows_processed = 0
-                for row_num, row in enumerate(reader, 2):  # начинаем с 2 (заголовок - строка 1)
+                # Пытаемся преобразовать рейтинг в число
+                rating = parsed_ratings.get(rating_str)
+                if rating is None:
                     try:
-                        # Проверяем, что строка не пустая
-                        if not row.get('brand') or not row.get('rating'):
-                            continue
-                            
-                        brand = row['brand'].strip()
-                        rating_str = row['rating'].strip()
-                        
-                        # Пропускаем пустые значения
-                        if not brand or not rating_str:
-                            continue
-                            
-                        # Пытаемся преобразовать рейтинг в число
                         rating = float(rating_str)
-                        
-                        # Проверяем допустимый диапазон рейтинга (0-5)
-                        if rating < 0 or rating > 5:
-                            print(f"Предупреждение: некорректный рейтинг {rating} в строке {row_num} файла {file}")
-                            continue
-                            
-                        row['brand'] = brand
-                        row['rating'] = rating
-                        data.append(row)
-                        rows_processed += 1
-                        
-                    except (ValueError, TypeError) as e:
-                        print(f"Предупреждение: пропущена строка {row_num} в файле {file} - некорректный формат рейтинга")
+                    except ValueError:
+                        skipped_count += 1
+                        if len(skipped_examples) < SKIPPED_ROWS_SHOWN:
+                            skipped_examples.append(f"строка {row_num} - некорректный формат рейтинга")
                         continue
-                        
-                if rows_processed == 0:
-                    print(f"Предупреждение: в файле {file} не найдено валидных данных")
-                    
-        except FileNotFoundError:
-            print(f"Ошибка: файл {file} не найден")
-            sys.exit(1)
-        except PermissionError:
-            print(f"Ошибка: нет доступа для чтения файла {file}")
-            sys.exit(1)
-        except Exception as e:
-            print(f"Ошибка чтения файла {file}: {e}")
-            sys.exit(1)
+                    if len(parsed_ratings) < RATING_CACHE_SIZE:
+                        parsed_ratings[rating_str] = rating
+                
+                # Проверяем допустимый диапазон рейтинга (0-5), 'nan' в него не входит
+                if not 0 <= rating <= 5:
+                    skipped_count += 1
+                    if len(skipped_examples) < SKIPPED_ROWS_SHOWN:
+                        skipped_examples.append(f"строка {row_num} - некорректный рейтинг {rating}")
+                    continue
+                
+                # Один экземпляр строки на бренд
+                yield sys.intern(brand), rating
+                rows_processed += 1
+                
+            if skipped_count:
+                examples = '; '.join(skipped_examples)
+                if skipped_count > len(skipped_examples):
+                    examples += '; ...'
+                print(f"Предупреждение: в файле {file} пропущено строк с некорректным рейтингом: {skipped_count} ({examples})")
+            if rows_processed == 0:
+                print(f"Предупреждение: в файле {file} не найдено валидных данных")
+                
+    except FileNotFoundError:
+        print(f"Ошибка: файл {file} не найден")
+        sys.exit(1)
+    except PermissionError:
+        print(f"Ошибка: нет доступа для чтения файла {file}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Ошибка чтения файла {file}: {e}")
+        sys.exit(1)
+
+
+def _parse_csv_file(file):
+    """Разбирает CSV-файл в рабочем процессе и возвращает статистику {бренд: [сумма, количество]}."""
+    brand_stats = defaultdict(lambda: [0.0, 0])
+    for brand, rating in _read_csv_file(file):
+        acc = brand_stats[brand]
+        acc[0] += rating
+        acc[1] += 1
+    return dict(brand_stats)
+
+
+def _use_process_pool(files):
+    """Проверяет, окупит ли объем входных данных запуск пула процессов."""
+    if len(files) < 2 or (os.cpu_count() or 1) < 2:
+        return False
+    # stat() запрашивается, только пока суммарный объем не достигнет порога
+    total_size = 0
+    try:
+        for file in files:
+            total_size += os.path.getsize(file)
+            if total_size >= PARALLEL_MIN_BYTES:
+                return True
+    except OSError:
+        # Об ошибке доступа к файлу сообщит само чтение
+        pass
+    return False
+
+
+def read_csv_files(files):
+    """Читает данные из всех переданных CSV-файлов и по одной отдает валидные строки."""
+    rows_total = 0
     
-    if not data:
+    for file in files:
+        for brand, rating in _read_csv_file(file):
+            yield {'brand': brand, 'rating': rating}
+            rows_total += 1
+    
+    if rows_total == 0:
         print("Ошибка: не удалось прочитать данные из переданных файлов")
         sys.exit(1)
-        
-    return data
+
+
+def read_brand_stats_parallel(files):
+    """Разбирает CSV-файлы в пуле процессов и объединяет их статистику по брендам."""
+    brand_stats = defaultdict(lambda: [0.0, 0])
+    workers = min(len(files), os.cpu_count())
+    files_left = iter(files)
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Следующий файл отправляется, когда освобождается процесс, поэтому после ошибки остальные не разбираются
+        pending = {executor.submit(_parse_csv_file, file) for file in islice(files_left, workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_stats = future.result()
+                for file in islice(files_left, 1):
+                    pending.add(executor.submit(_parse_csv_file, file))
+                for brand, (total, count) in file_stats.items():
+                    acc = brand_stats[brand]
+                    acc[0] += total
+                    acc[1] += count
+    
+    if not brand_stats:
+        print("Ошибка: не удалось прочитать данные из переданных файлов")
+        sys.exit(1)
+    
+    return brand_stats
 
 
 def calculate_average_rating(data):
     """Вычисляет средний рейтинг для каждого бренда и сортирует результаты."""
-    brand_ratings = defaultdict(list)
+    # Для каждого бренда храним [сумма, количество]
+    brand_stats = defaultdict(lambda: [0.0, 0])
     skipped_count = 0
+    # Для строк одного бренда подряд аккумулятор не ищется заново
+    last_brand = object()
+    acc = None
+    get_brand_rating = itemgetter('brand', 'rating')
     
     for row in data:
         try:
-            brand = row['brand']
-            rating = row['rating']
-            brand_ratings[brand].append(rating)
+            brand, rating = get_brand_rating(row)
+            # Проверяем рейтинг до обращения к аккумулятору
+            if not isinstance(rating, (int, float)):
+                raise TypeError(f"некорректный рейтинг: {rating!r}")
+            if brand is not last_brand:
+                acc = brand_stats[brand]
+                last_brand = brand
+            acc[0] += rating
+            acc[1] += 1
         except (KeyError, TypeError):
             skipped_count += 1
             continue
@@ -88,21 +202,34 @@ def calculate_average_rating(data):
     if skipped_count > 0:
         print(f"Предупреждение: пропущено {skipped_count} некорректных записей при расчете рейтинга")
     
-    if not brand_ratings:
+    if not brand_stats:
         print("Ошибка: нет данных для расчета рейтингов")
         return []
     
-    report = []
-    for brand, ratings in brand_ratings.items():
-        avg_rating = sum(ratings) / len(ratings)
-        report.append({'brand': brand, 'average_rating': round(avg_rating, 2)})
+    return _average_rating_report(brand_stats)
+
+
+def _average_rating_report(brand_stats):
+    """Строит отсортированный отчет о среднем рейтинге по статистике брендов."""
+    report = [
+        {'brand': brand, 'average_rating': round(total / count, 2)}
+        for brand, (total, count) in brand_stats.items()
+    ]
+    report.sort(key=itemgetter('average_rating'), reverse=True)
     
-    return sorted(report, key=lambda x: x['average_rating'], reverse=True)
+    return report
+
+
+def average_rating_report(files):
+    """Строит отчет о среднем рейтинге брендов по CSV-файлам."""
+    if _use_process_pool(files):
+        return _average_rating_report(read_brand_stats_parallel(files))
+    return calculate_average_rating(read_csv_files(files))
 
 
 def main():
     report_handlers = {
-        'average-rating': calculate_average_rating,
+        'average-rating': average_rating_report,
     }
     
     parser = argparse.ArgumentParser(description='Generate product reports.')
@@ -112,37 +239,21 @@ def main():
     try:
         args = parser.parse_args()
         
-        # Проверяем, что файлы существуют и имеют правильное расширение
-        valid_files = []
+        # Проверяем расширение; существование и права доступа проверит открытие файла
         for file in args.files:
-            if not os.path.isfile(file):
-                print(f"Ошибка: файл {file} не существует")
-                sys.exit(1)
-            elif not file.lower().endswith('.csv'):
+            if not file.lower().endswith('.csv'):
                 print(f"Ошибка: файл {file} не является CSV файлом")
                 sys.exit(1)
-            elif not os.access(file, os.R_OK):
-                print(f"Ошибка: нет доступа для чтения файла {file}")
-                sys.exit(1)
-            else:
-                valid_files.append(file)
-        
-        if not valid_files:
-            print("Ошибка: нет валидных файлов для обработки")
-            sys.exit(1)
             
-        # Читаем и обрабатываем данные
-        data = read_csv_files(valid_files)
-        
-        # Формируем отчет
-        report_data = report_handlers[args.report](data)
+        # Читаем файлы и формируем отчет
+        report_data = report_handlers[args.report](args.files)
         
         if not report_data:
             print("Отчет пуст - нет данных для отображения")
             sys.exit(0)
             
         # Выводим результат
-        print(tabulate(report_data, headers='keys', tablefmt='psql'))
+        sys.stdout.write(tabulate(report_data, headers='keys', tablefmt='psql') + '\n')
         
     except KeyboardInterrupt:
         print("\nПрограмма прервана пользователем")
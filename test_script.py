@@ -4,7 +4,8 @@ import tempfile
 import os
 import sys
 from unittest.mock import patch, mock_open
-from script import read_csv_files, calculate_average_rating, main
+from script import (read_csv_files, calculate_average_rating, main, _parse_csv_file,
+                    read_brand_stats_parallel, average_rating_report, _advise_sequential_read)
 
 
 @pytest.fixture
@@ -64,36 +65,112 @@ def edge_case_csv_files():
 
 def test_read_csv_files(sample_csv_files):
     """Тест корректного чтения CSV-файлов."""
-    data = read_csv_files(sample_csv_files)
+    data = list(read_csv_files(sample_csv_files))
     assert len(data) == 3
     assert data[0]['brand'] == 'apple'
     assert data[1]['brand'] == 'samsung'
     assert data[2]['brand'] == 'xiaomi'
 
 
+def test_read_csv_files_streams_into_report(sample_csv_files):
+    """Тест передачи строк из чтения напрямую в расчет рейтинга."""
+    report = calculate_average_rating(read_csv_files(sample_csv_files))
+    assert [row['brand'] for row in report] == ['apple', 'samsung', 'xiaomi']
+    assert report[0]['average_rating'] == 4.7
+
+
+def test_read_brand_stats_parallel(sample_csv_files):
+    """Тест объединения статистики по брендам из файлов, разобранных в пуле процессов."""
+    with patch('script.os.cpu_count', return_value=2):
+        brand_stats = read_brand_stats_parallel(sample_csv_files)
+    assert brand_stats == {'apple': [4.7, 1], 'samsung': [4.5, 1], 'xiaomi': [4.3, 1]}
+
+
+def test_average_rating_report_parallel(sample_csv_files):
+    """Тест совпадения отчета при разборе файлов в пуле процессов и в одном процессе."""
+    with patch('script.PARALLEL_MIN_BYTES', 0), patch('script.os.cpu_count', return_value=2):
+        report = average_rating_report(sample_csv_files + sample_csv_files)
+    assert report == calculate_average_rating(read_csv_files(sample_csv_files + sample_csv_files))
+
+
+def test_parse_csv_file_stats(sample_csv_files):
+    """Тест разбора файла рабочим процессом в статистику по брендам."""
+    assert _parse_csv_file(sample_csv_files[0]) == {'apple': [4.7, 1], 'samsung': [4.5, 1]}
+
+
+def test_read_brand_stats_parallel_error(sample_csv_files, capfd):
+    """Тест того, что после ошибки в одном файле еще не отправленные файлы не разбираются."""
+    # Крупный файл разбирается заметно дольше, чем падает файл с ошибкой кодировки
+    big_data = b'name,brand,price,rating\n' + b'phone,apple,1000,4.5\n' * 50000
+    files = []
+    for data in (b'\xff\xfe\xff\xfe', big_data, b'name,price\nphone,1000\n'):
+        with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.csv') as f:
+            f.write(data)
+            files.append(f.name)
+    bad_file, big_file, later_file = files
+
+    try:
+        with patch('script.os.cpu_count', return_value=2):
+            with pytest.raises(SystemExit):
+                read_brand_stats_parallel([bad_file, big_file] + sample_csv_files + [later_file])
+        # Файл в конце списка так и не был открыт, иначе было бы предупреждение о колонках
+        assert later_file not in capfd.readouterr().out
+    finally:
+        for file in files:
+            if os.path.exists(file):
+                os.unlink(file)
+
+
+def test_read_csv_files_interns_brands():
+    """Тест того, что одинаковые бренды представлены одним объектом строки."""
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
+        f.write("name,brand,price,rating\niphone,apple,1000,4.7\nmacbook,apple,2000,4.9\n")
+        temp_file = f.name
+
+    try:
+        data = list(read_csv_files([temp_file]))
+        assert data[0]['brand'] is data[1]['brand']
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+
+@pytest.mark.skipif(not hasattr(os, 'posix_fadvise'), reason='posix_fadvise недоступен')
+def test_advise_sequential_read(sample_csv_files):
+    """Тест подсказки ядру о последовательном чтении файла."""
+    with open(sample_csv_files[0]) as f:
+        with patch('script.os.posix_fadvise') as mock_fadvise:
+            _advise_sequential_read(f)
+        mock_fadvise.assert_called_once_with(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        # Ошибка подсказки не должна прерывать чтение
+        with patch('script.os.posix_fadvise', side_effect=OSError("not supported")):
+            _advise_sequential_read(f)
+
+
 def test_read_nonexistent_file():
     """Тест обработки несуществующих файлов."""
     with pytest.raises(SystemExit):
-        read_csv_files(['nonexistent.csv'])
+        list(read_csv_files(['nonexistent.csv']))
 
 
 def test_read_invalid_csv(invalid_csv_files):
     """Тест обработки CSV-файлов с некорректными данными."""
-    data = read_csv_files([invalid_csv_files[0]])
+    data = list(read_csv_files([invalid_csv_files[0]]))
     # Должен обработать только валидные данные (в данном случае - ни одной строки)
     assert len(data) == 0
 
 
 def test_read_csv_missing_columns(invalid_csv_files):
     """Тест обработки CSV-файлов с отсутствующими колонками."""
-    data = read_csv_files([invalid_csv_files[1]])
+    data = list(read_csv_files([invalid_csv_files[1]]))
     # Файл без колонки brand должен быть пропущен
     assert len(data) == 0
 
 
 def test_read_csv_edge_cases(edge_case_csv_files):
     """Тест обработки CSV-файлов с крайними случаями."""
-    data = read_csv_files(edge_case_csv_files)
+    data = list(read_csv_files(edge_case_csv_files))
     # Должен обработать только валидные данные
     assert len(data) == 1  # только строка с apple из третьего файла
 
@@ -105,7 +182,7 @@ def test_read_csv_with_out_of_range_ratings():
         temp_file = f.name
     
     try:
-        data = read_csv_files([temp_file])
+        data = list(read_csv_files([temp_file]))
         # Должен обработать только валидные данные (рейтинг 5.0)
         assert len(data) == 1
         assert data[0]['brand'] == 'samsung'
@@ -115,6 +192,91 @@ def test_read_csv_with_out_of_range_ratings():
             os.unlink(temp_file)
 
 
+def test_read_csv_repeated_ratings():
+    """Тест разбора повторяющихся значений рейтинга, в том числе после заполнения таблицы."""
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
+        f.write("name,brand,price,rating\na,apple,1,4.5\nb,apple,1,7\nc,apple,1,4.5\nd,sony,1,4\ne,sony,1,7\n")
+        temp_file = f.name
+
+    try:
+        for cache_size in (1024, 1):
+            with patch('script.RATING_CACHE_SIZE', cache_size):
+                data = list(read_csv_files([temp_file]))
+            # Рейтинг вне диапазона отбрасывается и при повторе
+            assert [row['rating'] for row in data] == [4.5, 4.5, 4.0]
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+
+def test_read_csv_whitespace_fields(capsys):
+    """Тест обработки пробелов и табуляций вокруг значений."""
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
+        f.write("name,brand,price,rating\nphone, apple ,1000, 4.5 \nphone,sony,500,  \n"
+                "phone,\tapple,1000,3.5\nphone,sony,500,\t\n")
+        temp_file = f.name
+
+    try:
+        data = list(read_csv_files([temp_file]))
+        # Строки с рейтингом из одних пробелов или табуляций пропускаются как пустые,
+        # бренд с табуляцией попадает в ту же группу
+        assert data == [{'brand': 'apple', 'rating': 4.5}, {'brand': 'apple', 'rating': 3.5}]
+        assert 'некорректн' not in capsys.readouterr().out
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+
+def test_read_csv_nan_rating():
+    """Тест отбрасывания нечисловых значений рейтинга, которые принимает float()."""
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
+        f.write("name,brand,price,rating\nphone,apple,1000,nan\nphone,samsung,800,4.0\n")
+        temp_file = f.name
+
+    try:
+        data = list(read_csv_files([temp_file]))
+        assert len(data) == 1
+        assert data[0]['brand'] == 'samsung'
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+
+def test_read_csv_skipped_rows_summary(capsys):
+    """Тест вывода одного итогового предупреждения об отброшенных строках файла."""
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
+        f.write("name,brand,price,rating\n" + "phone,apple,1000,bad\n" * 7 + "phone,sony,500,9\nphone,samsung,800,4.5\n")
+        temp_file = f.name
+
+    try:
+        data = list(read_csv_files([temp_file]))
+        assert len(data) == 1
+        out_lines = capsys.readouterr().out.splitlines()
+        assert len(out_lines) == 1
+        assert 'пропущено строк с некорректным рейтингом: 8' in out_lines[0]
+        assert 'строка 2 ' in out_lines[0]
+        assert 'строка 9 ' not in out_lines[0]
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+
+def test_read_csv_short_rows():
+    """Тест обработки пустых строк и строк, в которых не хватает полей."""
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
+        f.write("name,brand,price,rating\nphone,apple\n\nphone,samsung,800,4.5\n")
+        temp_file = f.name
+
+    try:
+        data = list(read_csv_files([temp_file]))
+        # Пустая строка и строка без рейтинга должны быть пропущены без ошибки
+        assert len(data) == 1
+        assert data[0]['brand'] == 'samsung'
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+
 def test_calculate_average_rating():
     """Тест корректного вычисления среднего рейтинга."""
     sample_data = [
@@ -145,6 +307,16 @@ def test_calculate_rating_with_invalid_data():
     assert report[0]['average_rating'] == 4.7
 
 
+def test_calculate_rating_non_numeric_rating():
+    """Тест пропуска бренда, у которого есть только нечисловой рейтинг."""
+    sample_data = [
+        {'brand': 'apple', 'rating': 4.0},
+        {'brand': 'sony', 'rating': None},
+    ]
+    report = calculate_average_rating(sample_data)
+    assert report == [{'brand': 'apple', 'average_rating': 4.0}]
+
+
 def test_calculate_rating_empty_data():
     """Тест вычисления рейтинга с пустыми данными."""
     sample_data = []
@@ -174,6 +346,22 @@ def test_calculate_rating_single_brand():
     assert report[0]['average_rating'] == 4.75
 
 
+def test_calculate_rating_interleaved_brands():
+    """Тест расчета рейтинга, когда строки брендов идут вперемешку и подряд."""
+    sample_data = [
+        {'brand': 'apple', 'rating': 4.0},
+        {'brand': 'apple', 'rating': 5.0},
+        {'brand': 'samsung', 'rating': 3.0},
+        {'brand': 'apple', 'rating': 3.0},
+        {'brand': 'samsung', 'rating': 4.0},
+    ]
+    report = calculate_average_rating(sample_data)
+    assert report == [
+        {'brand': 'apple', 'average_rating': 4.0},
+        {'brand': 'samsung', 'average_rating': 3.5},
+    ]
+
+
 def test_calculate_rating_rounding():
     """Тест округления среднего рейтинга."""
     sample_data = [
@@ -195,7 +383,7 @@ def test_file_encoding_error():
     try:
         # Должен завершиться с ошибкой SystemExit
         with pytest.raises(SystemExit):
-            read_csv_files([temp_file])
+            list(read_csv_files([temp_file]))
     finally:
         if os.path.exists(temp_file):
             os.unlink(temp_file)
@@ -206,7 +394,7 @@ def test_permission_error():
     # Мокаем open чтобы вызвать PermissionError
     with patch('builtins.open', side_effect=PermissionError("No permission")):
         with pytest.raises(SystemExit):
-            read_csv_files(['dummy.csv'])
+            list(read_csv_files(['dummy.csv']))
 
 
 @patch('script.read_csv_files')
@@ -236,16 +424,30 @@ def test_main_success(mock_tabulate, mock_calculate, mock_read):
     mock_tabulate.assert_called_once()
 
 
-@patch('script.read_csv_files')
-def test_main_no_data(mock_read):
+def test_main_no_data():
     """Тест main функции когда нет данных."""
-    mock_read.return_value = []  # Нет данных
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
+        f.write("name,brand,price,rating\n")  # Нет данных
+        temp_file = f.name
     
-    test_args = ["script.py", "--files", "test.csv", "--report", "average-rating"]
+    try:
+        test_args = ["script.py", "--files", temp_file, "--report", "average-rating"]
+        with patch.object(sys, 'argv', test_args):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+            # Должен завершиться с кодом 1 (ошибка)
+            assert exc_info.value.code == 1
+    finally:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+
+
+def test_main_nonexistent_file():
+    """Тест main функции для несуществующего файла."""
+    test_args = ["script.py", "--files", "nonexistent.csv", "--report", "average-rating"]
     with patch.object(sys, 'argv', test_args):
         with pytest.raises(SystemExit) as exc_info:
             main()
-        # Должен завершиться с кодом 1 (ошибка)
         assert exc_info.value.code == 1
 
 